@@ -0,0 +1,59 @@
+# Description: Startup and construction benchmark for the HashMap modules. Prints each module's import time
+# (taken from python -X importtime in a fresh interpreter) and how long it takes to build small maps, which is
+# what short-lived tools that create lots of maps pay for.
+
+
+import os
+import subprocess
+import sys
+import timeit
+
+MODULES = ('a6_include', 'hash_map_sc', 'hash_map_oa', 'hash_map_cuckoo')
+
+CASES = (
+    ('empty map', 'HashMap(11)'),
+    ('one put', 'm = HashMap(11); m.put("key", 1)'),
+    ('ten puts', 'm = HashMap(11)\nfor k in KEYS: m.put(k, 1)'),
+    ('capacity 1000', 'HashMap(1000)'),
+)
+
+
+def import_times() -> dict:
+    """
+    This function imports every module in a fresh interpreter with -X importtime and returns the
+    cumulative import time of each one in microseconds
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + ', '.join(MODULES)],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.strip() in MODULES:
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def construction_time(module: str, statement: str, number: int = 20000) -> float:
+    """
+    This function returns the best per-call time in microseconds of running statement with the module's
+    HashMap (built with its default hash function, hash_function_1)
+    """
+    setup = (f'from {module} import HashMap\n'
+             'KEYS = ["key" + str(i) for i in range(10)]')
+    return min(timeit.repeat(statement, setup, number=number, repeat=5)) / number * 1e6
+
+
+if __name__ == "__main__":
+
+    print("\nimport time (us, cumulative, first import in a fresh interpreter)")
+    print("------------------------------------------------------------------")
+    for name, microseconds in import_times().items():
+        print(f"{name:>16}: {microseconds:8d}")
+
+    print("\nconstruction time (us per map)")
+    print("------------------------------")
+    print(f"{'':>16}" + ''.join(f"{label:>15}" for label, _ in CASES))
+    for name in MODULES[1:]:
+        print(f"{name:>16}" + ''.join(f"{construction_time(name, statement):15.2f}" for _, statement in CASES))
@@ -0,0 +1,36 @@
+# Description: This file picks a HashMap engine at construction time. make_hash_map('sc' | 'oa' | 'cuckoo') returns
+# a map from hash_map_sc, hash_map_oa or hash_map_cuckoo; they all have the same constructor and methods, so code
+# written against one works with any of them.
+
+
+import importlib
+
+from a6_include import hash_function_1
+
+# engine name -> module containing its HashMap (imported the first time the engine is used)
+ENGINES = {
+    'sc': 'hash_map_sc',            # separate chaining
+    'oa': 'hash_map_oa',            # open addressing with quadratic probing
+    'cuckoo': 'hash_map_cuckoo',    # cuckoo hashing, bounded lookups
+}
+
+
+def make_hash_map(engine: str = 'sc', capacity: int = 11, function: callable = hash_function_1):
+    """
+    This function creates an empty HashMap of the given engine ('sc', 'oa' or 'cuckoo'). capacity and
+    function are passed to the engine's constructor. Note that get_capacity() reports the engine's own
+    capacity: a prime number of slots at or above capacity for 'sc' and 'oa', and the slots in both of
+    its tables for 'cuckoo' (make_hash_map('cuckoo', 11).get_capacity() is 14)
+    """
+    if engine not in ENGINES:
+        raise ValueError('engine must be one of ' + ', '.join(ENGINES))
+    return importlib.import_module(ENGINES[engine]).HashMap(capacity, function)
+
+
+if __name__ == "__main__":
+
+    for name in ENGINES:
+        m = make_hash_map(name)
+        for i in range(100):
+            m.put('key' + str(i), i)
+        print(f"{name:>6}: size {m.get_size()}, capacity {m.get_capacity()}, get('key42') = {m.get('key42')}")
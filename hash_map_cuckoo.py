@@ -0,0 +1,464 @@
+# Description: This file contains a HashMap that uses cuckoo hashing to avoid collisions. Every key lives either
+# in its slot in the first table, its slot in the second table, or a small stash, so get/contains_key/remove look at
+# no more than 2 + STASH_SIZE entries no matter how keys cluster.
+
+
+import os
+
+from a6_include import (DynamicArray, DynamicArrayException, HashEntry, hash_function_1, hash_function_2)
+
+# how many entries can be parked in the stash before the tables are rebuilt
+STASH_SIZE = 4
+
+# primes returned by _next_prime, keyed by the requested capacity (see hash_map_sc)
+_prime_cache = {}
+_PRIME_CACHE_LIMIT = 1024
+
+# salted hashes are (Python's string hash * an odd 64 bit seed), keeping the top 32 bits
+_MASK_64 = (1 << 64) - 1
+
+# table load at which put doubles the capacity
+MAX_LOAD = 0.4
+
+# how many times a rebuild tries new seeds before falling back to the next step (see HashMap._rebuild)
+MAX_REHASHES = 4
+
+
+class HashMap:
+
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1) -> None:
+        """
+        Initialize new HashMap that uses
+        cuckoo hashing for collision resolution. The requested capacity is split between two tables
+        of a prime number of slots each, so get_capacity() can differ from the other maps' (it's 14
+        for a capacity of 11: two tables of 7)
+        """
+        self._hash_function = function
+        self._salted_index_1 = False
+        self._size = 0
+        self._tracer = None
+        self._trace_countdown = 0
+
+        # the tables and stash aren't allocated (and the seeds aren't picked) until the first put, so a map
+        # that's created and never used costs very little
+        self._size_tables(capacity)
+        self._table_1 = None
+        self._table_2 = None
+        self._stash = None
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        if self._table_1 is None:
+            return ''.join(str(i) + ': None | None\n' for i in range(self._table_capacity)) + 'stash: \n'
+        out = ''
+        for i in range(self._table_1.length()):
+            out += str(i) + ': ' + str(self._table_1[i]) + ' | ' + str(self._table_2[i]) + '\n'
+        out += 'stash: ' + ', '.join(str(self._stash[i]) for i in range(self._stash.length())) + '\n'
+        return out
+
+    def _next_prime(self, capacity: int) -> int:
+        """
+        Increment from given number to find the closest prime number
+        """
+        if capacity % 2 == 0:
+            capacity += 1
+
+        while not self._is_prime(capacity):
+            capacity += 2
+
+        return capacity
+
+    @staticmethod
+    def _is_prime(capacity: int) -> bool:
+        """
+        Determine if given integer is a prime number and return boolean
+        """
+        if capacity == 2 or capacity == 3:
+            return True
+
+        if capacity == 1 or capacity % 2 == 0:
+            return False
+
+        factor = 3
+        while factor ** 2 <= capacity:
+            if capacity % factor == 0:
+                return False
+            factor += 2
+
+        return True
+
+    def _prime_capacity(self, capacity: int) -> int:
+        """
+        Return the prime capacity for a requested capacity, using the cache when possible
+        """
+        prime = _prime_cache.get(capacity)
+        if prime is None:
+            prime = self._next_prime(capacity)
+            if len(_prime_cache) < _PRIME_CACHE_LIMIT:
+                _prime_cache[capacity] = prime
+        return prime
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map. This is the number of slots in both tables together (always even,
+        and not prime like the other maps' capacities)
+        """
+        return self._capacity
+
+    def set_tracer(self, tracer) -> None:
+        """
+        Attach a tracing hook (see hash_map_trace.Tracer) that is given sampled put/get/contains_key/remove
+        calls to time. Pass None to turn tracing off. The map counts down to the next sampled call itself, so
+        calls that aren't sampled never call into the tracer
+        """
+        self._tracer = tracer
+        self._trace_countdown = tracer.next_countdown() if tracer is not None else 0
+
+    def _put_resize(self, key: str, new_capacity: int) -> None:
+        """
+        Resize the table from inside put. With a tracer attached the resize is always recorded, along with
+        the key whose put caused it, whether or not that put was sampled
+        """
+        if self._tracer is not None:
+            self._tracer.run_resize(self, key, new_capacity)
+        else:
+            self.resize_table(new_capacity)
+
+    # ------------------------------------------------------------------ #
+
+    def _size_tables(self, capacity: int) -> None:
+        """
+        This method sets the size of the two tables so that together they hold at least capacity slots.
+        Each table has a prime number of slots
+        """
+        table_capacity = self._prime_capacity(max(1, (capacity + 1) // 2))
+        self._table_capacity = table_capacity
+        self._capacity = table_capacity * 2
+        self._max_kicks = 8 + table_capacity.bit_length() * 4
+
+    def _new_tables(self) -> None:
+        """
+        This method replaces both tables and the stash with empty ones and picks new hash seeds
+        """
+        self._table_1 = DynamicArray([None] * self._table_capacity)
+        self._table_2 = DynamicArray([None] * self._table_capacity)
+        self._stash = DynamicArray()
+        # both seeds come from one os.urandom call (rather than the random module, which is slow to import)
+        seeds = int.from_bytes(os.urandom(16), 'little')
+        self._seed_1 = (seeds & _MASK_64) | 1
+        self._seed_2 = (seeds >> 64) | 1
+
+    def _hash_index(self, key: str, table: int) -> int:
+        """
+        This method returns the key's slot in table 1 or 2. Table 1 uses the map's hash function unless a
+        rebuild has switched it to a salted hash (see _rebuild). Table 2 always uses Python's hash salted
+        with a seed, so it's independent of the map's hash function and can be changed when the tables
+        are rebuilt. All hashing goes through here so hash_map_trace can time it
+        """
+        if table == 1:
+            if not self._salted_index_1:
+                return self._hash_function(key) % self._table_capacity
+            seed = self._seed_1
+        else:
+            seed = self._seed_2
+        return ((hash(key) * seed & _MASK_64) >> 32) % self._table_capacity
+
+    def _find(self, key: str) -> (DynamicArray, int):
+        """
+        This method returns the array and index that hold the key, or (None, 0) if the key isn't in the map
+        """
+        if self._table_1 is None:
+            return None, 0
+
+        index = self._hash_index(key, 1)
+        entry = self._table_1[index]
+        if entry is not None and entry.key == key:
+            return self._table_1, index
+
+        index = self._hash_index(key, 2)
+        entry = self._table_2[index]
+        if entry is not None and entry.key == key:
+            return self._table_2, index
+
+        index = 0
+        while index < self._stash.length():
+            if self._stash[index].key == key:
+                return self._stash, index
+            index += 1
+        return None, 0
+
+    def _insert(self, entry: HashEntry) -> HashEntry:
+        """
+        This method places an entry in the tables, kicking out whatever is in its slot and moving that
+        entry to its slot in the other table, and so on. Returns the entry left without a slot if that goes
+        on for too long (or None if everything found a place)
+        """
+        for _ in range(self._max_kicks):
+            index = self._hash_index(entry.key, 1)
+            displaced = self._table_1[index]
+            self._table_1[index] = entry
+            if displaced is None:
+                return None
+
+            index = self._hash_index(displaced.key, 2)
+            entry = self._table_2[index]
+            self._table_2[index] = displaced
+            if entry is None:
+                return None
+        return entry
+
+    def _place(self, entry: HashEntry) -> bool:
+        """
+        This method inserts an entry into the tables or, failing that, the stash. Returns False if the
+        stash has overflowed and the tables need to be rebuilt
+        """
+        homeless = self._insert(entry)
+        if homeless is None:
+            return True
+        # stash it even on overflow so the entry isn't lost before the rebuild picks it up
+        self._stash.append(homeless)
+        return self._stash.length() <= STASH_SIZE
+
+    def _rebuild(self, capacity: int) -> None:
+        """
+        This method moves every entry into new tables of the given capacity. If the entries can't all be
+        placed it tries again with new seeds. After MAX_REHASHES failed attempts the first table stops using
+        the map's hash function (it's probably sending lots of keys to the same slot, which no second hash
+        can fix) and uses a salted hash instead; after MAX_REHASHES more the capacity is doubled
+        """
+        entries = self.get_entries()
+        attempts = 0
+        self._size_tables(capacity)
+        while True:
+            self._new_tables()
+
+            index = 0
+            while index < entries.length():
+                if not self._place(entries[index]):
+                    break
+                index += 1
+            else:
+                return
+
+            attempts += 1
+            if attempts >= MAX_REHASHES:
+                attempts = 0
+                if self._salted_index_1:
+                    self._size_tables(self._capacity * 2)
+                self._salted_index_1 = True
+
+    def put(self, key: str, value: object) -> None:
+        """
+        This method adds a key:value pair to the map, replacing the value if the key is already present.
+        Tables are doubled once MAX_LOAD is reached, since cuckoo inserts start failing as the load nears 0.5
+        """
+        if self._tracer is not None:
+            self._trace_countdown -= 1
+            if not self._trace_countdown:
+                return self._tracer.run(self, 'put', key, HashMap.put, key, value)
+
+        array, index = self._find(key)
+        if array is not None:
+            array[index].value = value
+            return
+
+        if self._size + 1 > self._capacity * MAX_LOAD:
+            self._put_resize(key, self._capacity * 2)
+        elif self._table_1 is None:
+            self._new_tables()
+
+        self._size += 1
+        if not self._place(HashEntry(key, value)):
+            # rebuild through a resize to the same capacity (new seeds) so tracing records it as a resize
+            self._put_resize(key, self._capacity)
+
+    def table_load(self) -> float:
+        """
+        This method calculates and returns the current table load
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        This method returns how many empty slots there are in the two tables
+        """
+        if self._table_1 is None:
+            return self._capacity
+
+        counter = 0
+        index = 0
+        while index < self._table_capacity:
+            if self._table_1[index] is None:
+                counter += 1
+            if self._table_2[index] is None:
+                counter += 1
+            index += 1
+        return counter
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        This method is used to resize the map so the two tables together have at least new_capacity slots
+        """
+        if new_capacity < 1 or new_capacity < self._size:
+            return
+        # with a tracer attached every resize is timed and recorded (run_resize calls back in here)
+        if self._tracer is not None:
+            return self._tracer.run_resize(self, '', new_capacity)
+        self._rebuild(new_capacity)
+
+    def get(self, key: str) -> object:
+        """
+        This method returns the value stored for a key, or None if the key isn't in the map
+        """
+        if self._tracer is not None:
+            self._trace_countdown -= 1
+            if not self._trace_countdown:
+                return self._tracer.run(self, 'get', key, HashMap.get, key)
+
+        array, index = self._find(key)
+        if array is None:
+            return None
+        return array[index].value
+
+    def contains_key(self, key: str) -> bool:
+        """
+        This method returns True if the key is in the map. Else, it returns False
+        """
+        if self._tracer is not None:
+            self._trace_countdown -= 1
+            if not self._trace_countdown:
+                return self._tracer.run(self, 'contains_key', key, HashMap.contains_key, key)
+
+        array, _ = self._find(key)
+        return array is not None
+
+    def remove(self, key: str) -> None:
+        """
+        This method removes a key from the map. If it isn't present, this method does nothing
+        """
+        if self._tracer is not None:
+            self._trace_countdown -= 1
+            if not self._trace_countdown:
+                return self._tracer.run(self, 'remove', key, HashMap.remove, key)
+
+        array, index = self._find(key)
+        if array is None:
+            return
+
+        if array is self._stash:
+            # swap the last stashed entry into this spot so the stash stays packed
+            array.swap(index, array.length() - 1)
+            array.pop()
+        else:
+            array[index] = None
+        self._size -= 1
+
+    def clear(self) -> None:
+        """
+        This method clears the contents of the map without resetting its capacity
+        """
+        self._size = 0
+        if self._table_1 is None:
+            return
+
+        index = 0
+        while index < self._table_capacity:
+            self._table_1[index] = None
+            self._table_2[index] = None
+            index += 1
+        self._stash = DynamicArray()
+
+    def get_entries(self) -> DynamicArray:
+        """
+        This method returns a dynamic array holding every HashEntry in the map
+        """
+        entries = DynamicArray()
+        if self._table_1 is None:
+            return entries
+
+        for table in (self._table_1, self._table_2, self._stash):
+            index = 0
+            while index < table.length():
+                if table[index] is not None:
+                    entries.append(table[index])
+                index += 1
+        return entries
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        This method returns a dynamic array that contains each key/value pair (formatted as tuples)
+        """
+        entries = self.get_entries()
+        new_array = DynamicArray()
+        index = 0
+        while index < entries.length():
+            new_array.append((entries[index].key, entries[index].value))
+            index += 1
+        return new_array
+
+    def __iter__(self):
+        """
+        This method allows a HashMap to iterate across itself
+        """
+        self._iter_entries = self.get_entries()
+        self._index = 0
+        return self
+
+    def __next__(self):
+        """
+        Obtain next value and advance iterator
+        """
+        try:
+            value = self._iter_entries[self._index]
+        except DynamicArrayException:
+            raise StopIteration
+
+        self._index += 1
+        return value
+
+
+if __name__ == "__main__":
+
+    import itertools
+    import time
+
+    import hash_map_oa
+    import hash_map_sc
+
+    def percentiles(map_class, keys: list) -> str:
+        """Build a map from keys and return get latency percentiles (in microseconds)."""
+        m = map_class(11, hash_function_1)
+        for key in keys:
+            m.put(key, key)
+
+        timings = []
+        for key in keys:
+            start = time.perf_counter_ns()
+            m.get(key)
+            timings.append(time.perf_counter_ns() - start)
+        timings.sort()
+        p = [timings[min(len(timings) - 1, int(len(timings) * q))] / 1000 for q in (0.5, 0.99, 0.999)]
+        return f"p50 {p[0]:7.1f}  p99 {p[1]:7.1f}  p999 {p[2]:7.1f}  max {timings[-1] / 1000:7.1f}"
+
+    key_sets = {
+        # sequential keys pile up under hash_function_1 because it only sums character codes
+        'clustered': ['key' + str(i) for i in range(3000)],
+        # every permutation of the same letters has the same hash_function_1 value
+        'adversarial': [''.join(p) for p in itertools.islice(itertools.permutations('abcdefgh'), 1500)],
+    }
+
+    print("\nget latency in microseconds with hash_function_1")
+    print("-------------------------------------------------")
+    for name, keys in key_sets.items():
+        for label, map_class in (('sc', hash_map_sc.HashMap), ('oa', hash_map_oa.HashMap), ('cuckoo', HashMap)):
+            print(f"{name:>11} {label:>6}: {percentiles(map_class, keys)}")
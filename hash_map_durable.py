@@ -0,0 +1,319 @@
+# Description: This file contains a durable version of the open addressing HashMap. Every put/remove/clear is
+# appended to a binary write-ahead log before it's applied, and the map is periodically checkpointed to a compact
+# snapshot so the log can be truncated. Reopening the same directory replays snapshot + log to recover the map.
+
+
+import os
+import pickle
+import struct
+import time
+import zlib
+
+from a6_include import hash_function_1
+from hash_map_oa import HashMap
+
+# record layout: crc32 | op | key length | value length | key bytes | value bytes
+_HEADER = struct.Struct('<IBII')
+_OP_PUT = 1
+_OP_REMOVE = 2
+_OP_CLEAR = 3
+
+_SNAPSHOT_MAGIC = b'HMSNAP1\n'
+_SNAPSHOT_FILE = 'snapshot'
+_LOG_FILE = 'wal'
+
+FSYNC_POLICIES = ('always', 'batch', 'none')
+
+
+def _encode_record(op: int, key: str = '', value: object = None) -> bytes:
+    """
+    Encode a single log record. The checksum covers everything after the crc field so a torn write at the end
+    of the log can be detected on replay
+    """
+    key_bytes = key.encode('utf-8')
+    value_bytes = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL) if op == _OP_PUT else b''
+    body = _HEADER.pack(0, op, len(key_bytes), len(value_bytes))[4:] + key_bytes + value_bytes
+    return struct.pack('<I', zlib.crc32(body)) + body
+
+
+def _decode_records(data: bytes):
+    """
+    Generator that yields (op, key, value, end offset) tuples from a buffer of log records. Stops at the
+    first incomplete or corrupt record (i.e. whatever was being written when the process died)
+    """
+    offset = 0
+    end = len(data)
+    while offset + _HEADER.size <= end:
+        crc, op, key_len, value_len = _HEADER.unpack_from(data, offset)
+        record_end = offset + _HEADER.size + key_len + value_len
+        if record_end > end or zlib.crc32(data[offset + 4:record_end]) != crc:
+            return
+
+        key_start = offset + _HEADER.size
+        key = data[key_start:key_start + key_len].decode('utf-8')
+        value = pickle.loads(data[key_start + key_len:record_end]) if op == _OP_PUT else None
+        yield op, key, value, record_end
+        offset = record_end
+
+
+class DurableHashMap(HashMap):
+
+    def __init__(self,
+                 path: str,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 fsync: str = 'batch',
+                 batch_size: int = 64,
+                 sync_interval: float = 0.05,
+                 checkpoint_every: int = 10000) -> None:
+        """
+        Open (or create) a durable HashMap stored in the directory at path.
+
+        Every operation is written to the log file (i.e. handed to the OS) before it returns, so it
+        survives the process crashing. fsync controls when the log is forced to disk, which is what it
+        takes to survive the machine crashing:
+            'always' - fsync every operation before returning
+            'batch'  - group commit; one fsync covers all the operations since the last one, once
+                       batch_size of them are waiting or an operation is made more than sync_interval
+                       seconds after the last fsync. The interval is only checked when an operation is
+                       made (there's no timer), so call sync() before going idle
+            'none'   - never fsync (leave it to the OS)
+        Operations that haven't been fsynced yet can be lost if the machine crashes, but the map will
+        always recover to a consistent prefix of the operations that were made.
+        checkpoint_every is the number of logged operations after which a snapshot is written and the log
+        is truncated (0 disables automatic checkpoints).
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError('fsync must be one of ' + ', '.join(FSYNC_POLICIES))
+
+        super().__init__(capacity, function)
+
+        self._path = path
+        self._fsync = fsync
+        self._batch_size = max(1, batch_size)
+        self._sync_interval = sync_interval
+        self._checkpoint_every = checkpoint_every
+
+        self._pending_count = 0
+        self._log_count = 0
+        self._last_sync = time.monotonic()
+        self._logging = False
+
+        os.makedirs(path, exist_ok=True)
+        self._recover()
+        # unbuffered, so each record goes straight to the OS when it's appended
+        self._log = open(os.path.join(path, _LOG_FILE), 'ab', buffering=0)
+        self._logging = True
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        This method logs the put and then adds the key:value pair to the table
+        """
+        if not self._logging:
+            super().put(key, value)
+            return
+        self._append(_encode_record(_OP_PUT, key, value))
+        super().put(key, value)
+        self._maybe_checkpoint()
+
+    def remove(self, key: str) -> None:
+        """
+        This method logs the remove and then removes the key from the table (if it's present)
+        """
+        if not self._logging:
+            super().remove(key)
+            return
+        self._append(_encode_record(_OP_REMOVE, key))
+        super().remove(key)
+        self._maybe_checkpoint()
+
+    def clear(self) -> None:
+        """
+        This method logs the clear and then clears the table without resetting its capacity
+        """
+        if not self._logging:
+            super().clear()
+            return
+        self._append(_encode_record(_OP_CLEAR))
+        super().clear()
+        self._maybe_checkpoint()
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        This method resizes the table. Rehashing goes through put, so logging is switched off while it
+        runs to keep re-inserted entries out of the log
+        """
+        logging, self._logging = self._logging, False
+        try:
+            super().resize_table(new_capacity)
+        finally:
+            self._logging = logging
+
+    def sync(self) -> None:
+        """
+        This method forces the log records written since the last sync to disk (unless fsync is 'none')
+        """
+        if self._fsync != 'none':
+            os.fsync(self._log.fileno())
+        self._pending_count = 0
+        self._last_sync = time.monotonic()
+
+    def checkpoint(self) -> None:
+        """
+        This method writes a snapshot of the current contents and then truncates the log. The snapshot is
+        written to a temporary file and renamed into place, so a crash at any point leaves either the old
+        or the new snapshot (replaying the old log on top of the new snapshot is harmless)
+        """
+        self.sync()
+
+        pairs = self.get_keys_and_values()
+        out = bytearray(_SNAPSHOT_MAGIC)
+        out += struct.pack('<Q', pairs.length())
+        index = 0
+        while index < pairs.length():
+            key, value = pairs[index]
+            out += _encode_record(_OP_PUT, key, value)
+            index += 1
+
+        snapshot_path = os.path.join(self._path, _SNAPSHOT_FILE)
+        tmp_path = snapshot_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(out)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, snapshot_path)
+        self._fsync_dir()
+
+        self._log.truncate(0)
+        os.fsync(self._log.fileno())
+        self._log_count = 0
+
+    def close(self) -> None:
+        """
+        This method syncs any pending operations and closes the log file
+        """
+        if self._log.closed:
+            return
+        self.sync()
+        self._log.close()
+
+    def __enter__(self) -> "DurableHashMap":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------ #
+
+    def _append(self, record: bytes) -> None:
+        """
+        This method writes a record to the log and syncs it according to the fsync policy
+        """
+        view = memoryview(record)
+        while view:
+            view = view[self._log.write(view):]
+        self._pending_count += 1
+        self._log_count += 1
+
+        if (self._fsync == 'always'
+                or self._pending_count >= self._batch_size
+                or time.monotonic() - self._last_sync >= self._sync_interval):
+            self.sync()
+
+    def _maybe_checkpoint(self) -> None:
+        """
+        This method writes a checkpoint once enough operations have been logged since the last one
+        """
+        if self._checkpoint_every and self._log_count >= self._checkpoint_every:
+            self.checkpoint()
+
+    def _recover(self) -> None:
+        """
+        This method rebuilds the table from the snapshot and the log (if they exist). The snapshot is
+        bulk loaded: the table is sized for its entry count up front so no resizes happen while loading.
+        A torn record at the end of the log is expected after a crash, but the snapshot was fsynced before
+        it was renamed into place, so any damage to it raises ValueError rather than loading a partial map
+        """
+        snapshot_path = os.path.join(self._path, _SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, 'rb') as f:
+                data = f.read()
+            offset = len(_SNAPSHOT_MAGIC)
+            if not data.startswith(_SNAPSHOT_MAGIC) or len(data) < offset + 8:
+                raise ValueError('not a HashMap snapshot: ' + snapshot_path)
+
+            count = struct.unpack_from('<Q', data, offset)[0]
+            if count * 2 >= self._capacity:
+                self.resize_table(count * 2 + 1)
+
+            records = data[offset + 8:]
+            loaded, end = 0, 0
+            for _, key, value, end in _decode_records(records):
+                self.put(key, value)
+                loaded += 1
+            if loaded != count or end != len(records):
+                raise ValueError('corrupt HashMap snapshot (' + str(loaded) + ' of ' + str(count) +
+                                 ' records readable): ' + snapshot_path)
+
+        log_path = os.path.join(self._path, _LOG_FILE)
+        if os.path.exists(log_path):
+            with open(log_path, 'rb') as f:
+                data = f.read()
+
+            valid = 0
+            for op, key, value, valid in _decode_records(data):
+                if op == _OP_PUT:
+                    self.put(key, value)
+                elif op == _OP_REMOVE:
+                    self.remove(key)
+                else:
+                    self.clear()
+                self._log_count += 1
+
+            # drop a torn record at the end so new records aren't appended after garbage
+            if valid < len(data):
+                with open(log_path, 'r+b') as f:
+                    f.truncate(valid)
+
+    def _fsync_dir(self) -> None:
+        """
+        This method fsyncs the map's directory so the snapshot rename is durable (not supported on Windows)
+        """
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        fd = os.open(self._path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+if __name__ == "__main__":
+
+    import shutil
+    import tempfile
+
+    from a6_include import hash_function_2
+
+    print("\ndurable put throughput per fsync policy")
+    print("---------------------------------------")
+    n = 5000
+    m = HashMap(11, hash_function_2)
+    start = time.perf_counter()
+    for i in range(n):
+        m.put('key' + str(i), i)
+    print(f"{'memory':>6}: {n / (time.perf_counter() - start):10.0f} ops/s")
+
+    for policy in FSYNC_POLICIES:
+        directory = tempfile.mkdtemp()
+        m = DurableHashMap(directory, function=hash_function_2, fsync=policy, checkpoint_every=0)
+        start = time.perf_counter()
+        for i in range(n):
+            m.put('key' + str(i), i)
+        m.sync()
+        elapsed = time.perf_counter() - start
+        m.close()
+        print(f"{policy:>6}: {n / elapsed:10.0f} ops/s")
+        shutil.rmtree(directory)
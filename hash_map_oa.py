@@ -4,22 +4,27 @@
 
 from a6_include import (DynamicArray, DynamicArrayException, HashEntry, hash_function_1, hash_function_2)
 
+# primes returned by _next_prime, keyed by the requested capacity (see hash_map_sc)
+_prime_cache = {}
+_PRIME_CACHE_LIMIT = 1024
+
 class HashMap:
 
-    def __init__(self, capacity: int, function) -> None:
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1) -> None:
         """
         Initialize new HashMap that uses
         quadratic probing for collision resolution
         """
-        self._buckets = DynamicArray()
-
         # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
-        for _ in range(self._capacity):
-            self._buckets.append(None)
+        self._capacity = self._prime_capacity(capacity)
+        self._buckets = DynamicArray([None] * self._capacity)
 
         self._hash_function = function
         self._size = 0
+        self._tracer = None
+        self._trace_countdown = 0
 
     def __str__(self) -> str:
         """
@@ -63,6 +68,17 @@ class HashMap:
 
         return True
 
+    def _prime_capacity(self, capacity: int) -> int:
+        """
+        Return the prime capacity for a requested capacity, using the cache when possible
+        """
+        prime = _prime_cache.get(capacity)
+        if prime is None:
+            prime = self._next_prime(capacity)
+            if len(_prime_cache) < _PRIME_CACHE_LIMIT:
+                _prime_cache[capacity] = prime
+        return prime
+
     def get_size(self) -> int:
         """
         Return size of map
@@ -77,6 +93,25 @@ class HashMap:
         """
         return self._capacity
 
+    def set_tracer(self, tracer) -> None:
+        """
+        Attach a tracing hook (see hash_map_trace.Tracer) that is given sampled put/get/contains_key/remove
+        calls to time. Pass None to turn tracing off. The map counts down to the next sampled call itself, so
+        calls that aren't sampled never call into the tracer
+        """
+        self._tracer = tracer
+        self._trace_countdown = tracer.next_countdown() if tracer is not None else 0
+
+    def _put_resize(self, key: str, new_capacity: int) -> None:
+        """
+        Resize the table from inside put. With a tracer attached the resize is always recorded, along with
+        the key whose put caused it, whether or not that put was sampled
+        """
+        if self._tracer is not None:
+            self._tracer.run_resize(self, key, new_capacity)
+        else:
+            self.resize_table(new_capacity)
+
     # ------------------------------------------------------------------ #
 
     def put(self, key: str, value: object) -> None:
@@ -84,6 +119,10 @@ class HashMap:
         This method adds a value into a hash table and, if the indexed spot is full, probes until an empty spot is found.
         If the key is already in the array, replace
         """
+        if self._tracer is not None:
+            self._trace_countdown -= 1
+            if not self._trace_countdown:
+                return self._tracer.run(self, 'put', key, HashMap.put, key, value)
         # Quadratic probing: i = (initial + j2) % m(where, j=1, 2, 3, …)
 
         table_load = self.table_load()
@@ -91,7 +130,7 @@ class HashMap:
         new_hash_entry = HashEntry(key, value)
 
         if table_load >= 0.5:
-            self.resize_table(self.get_capacity() * 2)
+            self._put_resize(key, self.get_capacity() * 2)
 
         # j ** 0 assesses to 0, so start j at 0 instead of 1
 
@@ -147,6 +186,11 @@ class HashMap:
         if new_capacity < 1 or new_capacity < self.get_size():
             return
 
+        # with a tracer attached every resize is timed and recorded; run_resize switches tracing off and calls
+        # back in here, so the rehash puts below are never sampled as puts of their own
+        if self._tracer is not None:
+            return self._tracer.run_resize(self, '', new_capacity)
+
         # else, see if the new capacity is prime. if it isn't, find next prime and set that to new capacity
         if new_capacity > 1:
             if not self._is_prime(new_capacity):
@@ -157,10 +201,8 @@ class HashMap:
 
         # declare self._buckets to be empty dynamic array
         # override old self._buckets and create new dynamic array with open slots
-        self._buckets = DynamicArray()
         self._capacity = new_capacity
-        for _ in range(self._capacity):
-            self._buckets.append(None)  # this might be causing problems with the iter/next?
+        self._buckets = DynamicArray([None] * self._capacity)
         self._size = 0  # to prevent looping
 
         index = 0
@@ -176,6 +218,10 @@ class HashMap:
         """
         This method is called to retrieve a value if the input key is present in the table. Else, return none
         """
+        if self._tracer is not None:
+            self._trace_countdown -= 1
+            if not self._trace_countdown:
+                return self._tracer.run(self, 'get', key, HashMap.get, key)
 
         hashed_key = self._hash_function(key)
 
@@ -196,6 +242,10 @@ class HashMap:
         """
         This method searches the dynamic array and returns True if the key is found; returns False if not.
         """
+        if self._tracer is not None:
+            self._trace_countdown -= 1
+            if not self._trace_countdown:
+                return self._tracer.run(self, 'contains_key', key, HashMap.contains_key, key)
         hashed_key = self._hash_function(key)
         j = 0
         while True:
@@ -211,6 +261,10 @@ class HashMap:
         This method searches the array and removes an item if the input key is found. If it isn't present, this
         method does nothing
         """
+        if self._tracer is not None:
+            self._trace_countdown -= 1
+            if not self._trace_countdown:
+                return self._tracer.run(self, 'remove', key, HashMap.remove, key)
         hashed_key = self._hash_function(key)
         j = 0
         while True:
@@ -228,10 +282,7 @@ class HashMap:
         """
         This method clears the contents of a hashmap without resetting its capacity
         """
-        index = 0
-        while index < self.get_capacity():
-            self._buckets[index] = None
-            index += 1
+        self._buckets = DynamicArray([None] * self._capacity)
         self._size = 0
 
     def get_keys_and_values(self) -> DynamicArray:
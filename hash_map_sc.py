@@ -4,6 +4,11 @@
 
 from a6_include import (DynamicArray, LinkedList, hash_function_1, hash_function_2)
 
+# primes returned by _next_prime, keyed by the requested capacity. Most maps are created with one of a few
+# capacities, so this saves redoing the trial division every time one is constructed
+_prime_cache = {}
+_PRIME_CACHE_LIMIT = 1024
+
 class HashMap:
     def __init__(self,
                  capacity: int = 11,
@@ -12,23 +17,26 @@ class HashMap:
         Initialize new HashMap that uses
         separate chaining for collision resolution
         """
-        self._buckets = DynamicArray()
-
         # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
-        for _ in range(self._capacity):
-            self._buckets.append(LinkedList())
+        self._capacity = self._prime_capacity(capacity)
+
+        # the table isn't allocated until the first put, and each bucket stays None until a key is
+        # put in it, so a map that's created and barely used costs very little
+        self._buckets = None
 
         self._hash_function = function
         self._size = 0
+        self._tracer = None
+        self._trace_countdown = 0
 
     def __str__(self) -> str:
         """
         Override string method to provide more readable output
         """
         out = ''
-        for i in range(self._buckets.length()):
-            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
+        for i in range(self._capacity):
+            bucket = self._buckets[i] if self._buckets is not None else None
+            out += str(i) + ': ' + (str(bucket) if bucket is not None else 'SLL []') + '\n'
         return out
 
     def _next_prime(self, capacity: int) -> int:
@@ -62,6 +70,17 @@ class HashMap:
 
         return True
 
+    def _prime_capacity(self, capacity: int) -> int:
+        """
+        Return the prime capacity for a requested capacity, using the cache when possible
+        """
+        prime = _prime_cache.get(capacity)
+        if prime is None:
+            prime = self._next_prime(capacity)
+            if len(_prime_cache) < _PRIME_CACHE_LIMIT:
+                _prime_cache[capacity] = prime
+        return prime
+
     def get_size(self) -> int:
         """
         Return size of map
@@ -76,6 +95,33 @@ class HashMap:
         """
         return self._capacity
 
+    def set_tracer(self, tracer) -> None:
+        """
+        Attach a tracing hook (see hash_map_trace.Tracer) that is given sampled put/get/contains_key/remove
+        calls to time. Pass None to turn tracing off. The map counts down to the next sampled call itself, so
+        calls that aren't sampled never call into the tracer
+        """
+        self._tracer = tracer
+        self._trace_countdown = tracer.next_countdown() if tracer is not None else 0
+
+    def _put_resize(self, key: str, new_capacity: int) -> None:
+        """
+        Resize the table from inside put. With a tracer attached the resize is always recorded, along with
+        the key whose put caused it, whether or not that put was sampled
+        """
+        if self._tracer is not None:
+            self._tracer.run_resize(self, key, new_capacity)
+        else:
+            self.resize_table(new_capacity)
+
+    def _find_bucket(self, key: str) -> LinkedList:
+        """
+        Return the bucket the key hashes to, or None if it (or the whole table) hasn't been allocated yet
+        """
+        if self._buckets is None:
+            return None
+        return self._buckets[self._hash_function(key) % self._capacity]
+
     # ------------------------------------------------------------------ #
 
 
@@ -83,32 +129,46 @@ class HashMap:
         """
         This method adds a key:value pair to a hash table (and calls resize, if necessary).
         """
+        if self._tracer is not None:
+            self._trace_countdown -= 1
+            if not self._trace_countdown:
+                return self._tracer.run(self, 'put', key, HashMap.put, key, value)
         # IF KEY IS ALREADY IN HASHMAP, REPLACE OLD VALUE WITH NEW VALUE
         if self.table_load() >= 1:
-            self.resize_table(self._capacity * 2)
+            self._put_resize(key, self._capacity * 2)
+
+        if self._buckets is None:
+            self._buckets = DynamicArray([None] * self._capacity)
 
         hashed_key = self._hash_function(key)
         index = hashed_key % self.get_capacity()
 
-        if not self.contains_key(key):
-            self._buckets[index].insert(key, value)
-            self._size += 1
+        bucket = self._buckets[index]
+        if bucket is None:
+            bucket = LinkedList()
+            self._buckets[index] = bucket
         else:
             # key is already present in structure; need to override value. DON'T INCREASE SIZE
-            for node in self._buckets[index]:
-                if node.key == key:
-                    node.value = value
+            node = bucket.contains(key)
+            if node:
+                node.value = value
+                return
+
+        bucket.insert(key, value)
+        self._size += 1
 
     def empty_buckets(self) -> int:
         """
         This method returns how many empty buckets there are within a given hashmap
         """
-        # print('empty_buckets')
-        # each 'empty' node in a HashMap DA is the head of a (empty) linked list, so assess by using length
+        # buckets that haven't been used yet are None; ones that have been emptied are empty linked lists
+        if self._buckets is None:
+            return self._capacity
+
         index = 0
         counter = 0
         while index < self._buckets.length():
-            if self._buckets[index].length() == 0:
+            if self._buckets[index] is None or self._buckets[index].length() == 0:
                 counter += 1
             index += 1
         return counter
@@ -123,13 +183,10 @@ class HashMap:
 
     def clear(self) -> None:
         """
-        This method is used to clear a table. It clears the individual buckets but leaves the original
-        capacity intact.
+        This method is used to clear a table. It drops the buckets (they're allocated again on the next put)
+        but leaves the original capacity intact.
         """
-        index = 0
-        while index < self._buckets.length():
-            self._buckets[index] = LinkedList()
-            index += 1
+        self._buckets = None
         self._size = 0
 
     def resize_table(self, new_capacity: int) -> None:
@@ -140,6 +197,11 @@ class HashMap:
         if new_capacity < 1:
             return
 
+        # with a tracer attached every resize is timed and recorded; run_resize switches tracing off and calls
+        # back in here, so the rehash puts below are never sampled as puts of their own
+        if self._tracer is not None:
+            return self._tracer.run_resize(self, '', new_capacity)
+
         if new_capacity >= 1:
             if not self._is_prime(new_capacity):
                 new_capacity = self._next_prime(new_capacity)
@@ -147,18 +209,18 @@ class HashMap:
         # save old values
         old_table = self._buckets
 
-        # declare self._buckets to be empty dynamic array
-        # override old self._buckets and create new dynamic array with open slots
-        self._buckets = DynamicArray()
+        # override old self._buckets; if the table hasn't been allocated yet there's nothing to move
         self._capacity = new_capacity
-        for _ in range(self._capacity):
-            self._buckets.append(LinkedList())
+        if old_table is None:
+            return
+        self._buckets = DynamicArray([None] * self._capacity)
         self._size = 0 # to prevent looping
 
         index = 0
         while index < old_table.length():
-            for node in old_table[index]:
-                self.put(node.key, node.value)
+            if old_table[index] is not None:
+                for node in old_table[index]:
+                    self.put(node.key, node.value)
             index += 1
 
     def get(self, key: str):
@@ -166,11 +228,16 @@ class HashMap:
         This method searches for a key and, if found, returns the value associated with that key.
         If it's not found, this method does nothing
         """
+        if self._tracer is not None:
+            self._trace_countdown -= 1
+            if not self._trace_countdown:
+                return self._tracer.run(self, 'get', key, HashMap.get, key)
 
-        hashed_key = self._hash_function(key)
-        index = hashed_key % self.get_capacity()
+        bucket = self._find_bucket(key)
+        if bucket is None:
+            return None
 
-        for node in self._buckets[index]:
+        for node in bucket:
             if node.key == key:
                 return node.value
         return None
@@ -179,10 +246,15 @@ class HashMap:
         """
         This method returns True if input key is present in hashmap. Else, it returns False
         """
-        hashed_key = self._hash_function(key)
-        index = hashed_key % self.get_capacity()
+        if self._tracer is not None:
+            self._trace_countdown -= 1
+            if not self._trace_countdown:
+                return self._tracer.run(self, 'contains_key', key, HashMap.contains_key, key)
+        bucket = self._find_bucket(key)
+        if bucket is None:
+            return False
 
-        for node in self._buckets[index]:
+        for node in bucket:
             if node.key == key:
                 return True
         return False
@@ -191,9 +263,13 @@ class HashMap:
         """
         This method removes an input key
         """
-        hashed_key = self._hash_function(key)
-        index = hashed_key % self.get_capacity()
-        bucket = self._buckets[index]
+        if self._tracer is not None:
+            self._trace_countdown -= 1
+            if not self._trace_countdown:
+                return self._tracer.run(self, 'remove', key, HashMap.remove, key)
+        bucket = self._find_bucket(key)
+        if bucket is None:
+            return
 
         for node in bucket:
             if node.key == key:
@@ -206,12 +282,15 @@ class HashMap:
         in the hashmap (order doesn't matter).
         """
         new_array = DynamicArray()
+        if self._buckets is None:
+            return new_array
 
         index = 0
         while index < self._buckets.length():
-            for node in self._buckets[index]:
-                new_tuple = (node.key, node.value)
-                new_array.append(new_tuple)
+            if self._buckets[index] is not None:
+                for node in self._buckets[index]:
+                    new_tuple = (node.key, node.value)
+                    new_array.append(new_tuple)
             index += 1
         return new_array
 
@@ -0,0 +1,190 @@
+# Description: This file contains tracing hooks for the HashMaps. A Tracer attached with HashMap.set_tracer() is
+# handed a sample of put/get/contains_key/remove calls and times how long each one spends hashing, probing
+# (or walking a chain) and resizing. Resizes are rare and expensive, so every one is recorded, sampled or not.
+# ChromeTraceExporter saves those timings to a JSON file that can be opened in chrome://tracing or Perfetto, and
+# running this file as a script prints the slowest operations and hottest keys.
+
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+
+class Tracer:
+    """
+    Base tracing hook. Roughly one in every sample_every calls is traced (the gap between samples is
+    randomized so it doesn't line up with patterns in the workload) and handed to run(). Subclasses
+    override record()
+    """
+
+    def __init__(self, sample_every: int = 100) -> None:
+        """Initialize the tracer with its sampling interval (1 traces every call)."""
+        self._sample_every = max(1, sample_every)
+
+    def next_countdown(self) -> int:
+        """
+        Return how many calls the map should count down before the next sampled one. The map keeps the
+        countdown itself (see set_tracer), so calls that aren't sampled cost a decrement and never call in here
+        """
+        if self._sample_every == 1:
+            return 1
+        return random.randint(1, 2 * self._sample_every - 1)
+
+    def run(self, hash_map, op: str, key: str, method, *args):
+        """
+        This method runs method(hash_map, *args) with timers around the map's hashing and resize_table,
+        then passes the phase timings to record(). Hashing is the map's _hash_index method if it has one
+        (the cuckoo map, which also uses salted hashes) and its hash function otherwise. Probe time is
+        whatever is left of the total after hashing and resizing (bucket/DynamicArray access, comparisons
+        and chain walks)
+        """
+        hash_name = '_hash_index' if hasattr(type(hash_map), '_hash_index') else '_hash_function'
+        hash_function = getattr(hash_map, hash_name)
+        resize_table = hash_map.resize_table
+        phases = {'hash': 0, 'resize': 0}
+
+        def timed_hash(*hash_args):
+            start = time.perf_counter_ns()
+            result = hash_function(*hash_args)
+            phases['hash'] += time.perf_counter_ns() - start
+            return result
+
+        def timed_resize(new_capacity):
+            # rehashing during a resize counts as resize time, not hash time
+            hash_before = phases['hash']
+            phases['resize'] += self._time_resize(hash_map, key, resize_table, new_capacity)
+            phases['hash'] = hash_before
+
+        hash_map._trace_countdown = self.next_countdown()
+        hash_map._tracer = None
+        setattr(hash_map, hash_name, timed_hash)
+        hash_map.resize_table = timed_resize
+        start = time.perf_counter_ns()
+        try:
+            return method(hash_map, *args)
+        finally:
+            total = time.perf_counter_ns() - start
+            del hash_map.resize_table
+            if hash_name == '_hash_index':
+                del hash_map._hash_index
+            else:
+                hash_map._hash_function = hash_function
+            hash_map._tracer = self
+            phases['probe'] = max(0, total - phases['hash'] - phases['resize'])
+            self.record(hash_map, op, key, start, total, phases)
+
+    def run_resize(self, hash_map, key: str, new_capacity: int) -> None:
+        """
+        This method is called by the map for every resize while the tracer is attached, whether or not the
+        call that caused it was sampled. key is the key whose put triggered the resize ('' if resize_table
+        was called directly). Tracing is switched off while it runs so the rehash puts aren't sampled
+        """
+        hash_map._tracer = None
+        try:
+            self._time_resize(hash_map, key, hash_map.resize_table, new_capacity)
+        finally:
+            hash_map._tracer = self
+
+    def _time_resize(self, hash_map, key: str, resize_table, new_capacity: int) -> int:
+        """
+        This method runs resize_table(new_capacity), records it as a 'resize_table' call and returns how
+        long it took in nanoseconds
+        """
+        start = time.perf_counter_ns()
+        resize_table(new_capacity)
+        total = time.perf_counter_ns() - start
+        self.record(hash_map, 'resize_table', key, start, total, {'hash': 0, 'probe': 0, 'resize': total})
+        return total
+
+    def record(self, hash_map, op: str, key: str, start_ns: int, total_ns: int, phases: dict) -> None:
+        """
+        This method receives the timings (in nanoseconds) of one sampled call, or of a resize. phases has
+        'hash', 'probe' and 'resize' entries. The base class ignores them
+        """
+        pass
+
+
+class ChromeTraceExporter(Tracer):
+    """
+    Tracer that keeps (up to max_events) sampled calls in memory and writes them out in the Chrome trace
+    event format. Each call is a complete ('X') event with its key and phase timings in args
+    """
+
+    def __init__(self, sample_every: int = 100, max_events: int = 100000) -> None:
+        """Initialize the exporter with its sampling interval and event limit."""
+        super().__init__(sample_every)
+        self._max_events = max_events
+        self._events = []
+        self.dropped = 0
+
+    def record(self, hash_map, op: str, key: str, start_ns: int, total_ns: int, phases: dict) -> None:
+        """Save the call as a trace event (or count it as dropped if the buffer is full)."""
+        if len(self._events) >= self._max_events:
+            self.dropped += 1
+            return
+
+        self._events.append({
+            'name': op,
+            'cat': type(hash_map).__module__,
+            'ph': 'X',
+            'ts': start_ns / 1000,
+            'dur': total_ns / 1000,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': {
+                'key': str(key),
+                'hash_us': phases['hash'] / 1000,
+                'probe_us': phases['probe'] / 1000,
+                'resize_us': phases['resize'] / 1000,
+                'size': hash_map.get_size(),
+                'capacity': hash_map.get_capacity(),
+            },
+        })
+
+    def write(self, path: str) -> None:
+        """Write the saved events to path as a Chrome trace JSON file."""
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self._events, 'displayTimeUnit': 'ns',
+                       'otherData': {'dropped': self.dropped}}, f)
+
+
+def summarize(events: list, top: int = 10) -> str:
+    """
+    This function returns a report of the slowest calls in a list of trace events and the keys that
+    account for the most traced time (hot keys)
+    """
+    out = 'slowest operations\n'
+    out += f"{'op':<14}{'total us':>10}{'hash':>10}{'probe':>10}{'resize':>10}  key\n"
+    for event in sorted(events, key=lambda e: e['dur'], reverse=True)[:top]:
+        args = event['args']
+        out += (f"{event['name']:<14}{event['dur']:>10.1f}{args['hash_us']:>10.1f}"
+                f"{args['probe_us']:>10.1f}{args['resize_us']:>10.1f}  {args['key']}\n")
+
+    keys = {}
+    for event in events:
+        count, total, worst = keys.get(event['args']['key'], (0, 0.0, 0.0))
+        keys[event['args']['key']] = (count + 1, total + event['dur'], max(worst, event['dur']))
+
+    out += '\nhot keys\n'
+    out += f"{'calls':>6}{'total us':>10}{'max us':>10}  key\n"
+    for key, (count, total, worst) in sorted(keys.items(), key=lambda item: item[1][1], reverse=True)[:top]:
+        out += f"{count:>6}{total:>10.1f}{worst:>10.1f}  {key}\n"
+    return out
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Print the slowest operations and hot keys in a HashMap trace')
+    parser.add_argument('trace', help='JSON file written by ChromeTraceExporter.write()')
+    parser.add_argument('--top', type=int, default=10, help='number of rows to print in each table')
+    parser.add_argument('--op', help='only look at this operation (put, get, contains_key, remove or resize_table)')
+    cli_args = parser.parse_args()
+
+    with open(cli_args.trace) as trace_file:
+        trace_events = json.load(trace_file)['traceEvents']
+    if cli_args.op:
+        trace_events = [e for e in trace_events if e['name'] == cli_args.op]
+    print(summarize(trace_events, cli_args.top), end='')
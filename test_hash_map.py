@@ -0,0 +1,46 @@
+# Description: Tests for make_hash_map. Each engine is built through the factory and checked to behave the same.
+
+
+import unittest
+
+import hash_map_cuckoo
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_2
+from hash_map import ENGINES, make_hash_map
+
+
+class MakeHashMapTest(unittest.TestCase):
+
+    def test_engines(self) -> None:
+        """Each engine name gives that module's HashMap, built with the requested capacity and function."""
+        modules = {'sc': hash_map_sc, 'oa': hash_map_oa, 'cuckoo': hash_map_cuckoo}
+        self.assertEqual(set(ENGINES), set(modules))
+        for name, module in modules.items():
+            with self.subTest(engine=name):
+                m = make_hash_map(name, 11, hash_function_2)
+                self.assertIs(type(m), module.HashMap)
+                self.assertIs(m._hash_function, hash_function_2)
+                for i in range(200):
+                    m.put('key' + str(i), i)
+                m.remove('key7')
+                self.assertEqual(m.get_size(), 199)
+                self.assertEqual(m.get('key42'), 42)
+                self.assertTrue(m.contains_key('key8'))
+                self.assertIsNone(m.get('key7'))
+
+    def test_same_defaults(self) -> None:
+        """All engines can be built with no arguments, and the factory defaults to separate chaining."""
+        self.assertIs(type(make_hash_map()), hash_map_sc.HashMap)
+        self.assertEqual(hash_map_sc.HashMap().get_capacity(), 11)
+        self.assertEqual(hash_map_oa.HashMap().get_capacity(), 11)
+        # the cuckoo map's capacity counts both of its tables
+        self.assertEqual(hash_map_cuckoo.HashMap().get_capacity(), 14)
+
+    def test_unknown_engine(self) -> None:
+        with self.assertRaises(ValueError):
+            make_hash_map('linear')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+# Description: Crash recovery tests for DurableHashMap. Writers run in a child process that is SIGKILLed part way
+# through, then the map is reopened from its directory and checked against the operations the writer reported.
+
+
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from hash_map_durable import DurableHashMap, _LOG_FILE, _SNAPSHOT_FILE
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# puts key i, removes key i - 3 on every 7th step and prints the step number once the operation returns
+WRITER = '''
+import sys
+sys.path.insert(0, {here!r})
+from hash_map_durable import DurableHashMap
+
+m = DurableHashMap({path!r}, fsync='always', checkpoint_every=100)
+i = 0
+while True:
+    m.put('k' + str(i), i)
+    if i % 7 == 0:
+        m.remove('k' + str(i - 3))
+    print(i, flush=True)
+    i += 1
+'''
+
+# writes some keys, then dies right after the snapshot has been renamed into place (before the log is truncated)
+CHECKPOINT_CRASH = '''
+import os, signal, sys
+sys.path.insert(0, {here!r})
+from hash_map_durable import DurableHashMap
+
+m = DurableHashMap({path!r}, fsync='always', checkpoint_every=0)
+for i in range(50):
+    m.put('k' + str(i), i)
+m.remove('k10')
+m.put('k11', 'changed')
+m._fsync_dir = lambda: os.kill(os.getpid(), signal.SIGKILL)
+m.checkpoint()
+'''
+
+
+def expected_value(i: int, last: int):
+    """
+    Return what key i (i <= last) holds once WRITER has acknowledged steps 0..last: None if it was removed,
+    or ... if it's unknown. The writer keeps going until the kill arrives, so any number of steps after
+    last may also be in the log, and key i is removed by step i + 3 when i % 7 == 4
+    """
+    if i % 7 != 4:
+        return i
+    if i + 3 <= last:
+        return None
+    return ...
+
+
+@unittest.skipUnless(hasattr(signal, 'SIGKILL'), 'needs SIGKILL')
+class DurableHashMapCrashTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = self._dir.name
+
+    def tearDown(self) -> None:
+        self._dir.cleanup()
+
+    def test_kill_mid_write(self) -> None:
+        """Every put/remove the writer reported before being killed is recovered."""
+        # stop at each position in the 7 step remove cycle, so some kills land right around a remove
+        for stop in range(450, 457):
+            with self.subTest(stop=stop):
+                self._kill_mid_write(os.path.join(self.path, str(stop)), stop)
+
+    def _kill_mid_write(self, path: str, stop: int) -> None:
+        """Run WRITER until it has acknowledged at least stop steps, kill it and check what was recovered."""
+        writer = subprocess.Popen([sys.executable, '-c', WRITER.format(here=HERE, path=path)],
+                                  stdout=subprocess.PIPE, text=True)
+        last = -1
+        while last < stop:
+            last = int(writer.stdout.readline())
+        os.kill(writer.pid, signal.SIGKILL)
+        writer.wait()
+        writer.stdout.close()
+
+        m = DurableHashMap(path)
+        for i in range(last + 1):
+            expected = expected_value(i, last)
+            if expected is not ...:
+                self.assertEqual(m.get('k' + str(i)), expected, 'k' + str(i))
+
+        m.put('after', 1)
+        m.close()
+        self.assertEqual(DurableHashMap(path).get('after'), 1)
+
+    def test_torn_record_at_end_of_log(self) -> None:
+        """A partial record at the end of the log is dropped and new records are appended after the good ones."""
+        m = DurableHashMap(self.path, fsync='always', checkpoint_every=0)
+        for i in range(20):
+            m.put('k' + str(i), i)
+        m.close()
+
+        log_path = os.path.join(self.path, _LOG_FILE)
+        with open(log_path, 'ab') as f:
+            f.write(b'\x01\x02\x03torn')
+
+        m = DurableHashMap(self.path)
+        self.assertEqual(m.get_size(), 20)
+        m.put('after', 'x')
+        m.close()
+
+        m = DurableHashMap(self.path)
+        self.assertEqual(m.get_size(), 21)
+        self.assertEqual(m.get('k19'), 19)
+        self.assertEqual(m.get('after'), 'x')
+
+    def test_crash_between_snapshot_rename_and_log_truncate(self) -> None:
+        """Replaying the old log on top of the new snapshot gives the same contents."""
+        writer = subprocess.run([sys.executable, '-c', CHECKPOINT_CRASH.format(here=HERE, path=self.path)])
+        self.assertEqual(writer.returncode, -signal.SIGKILL)
+        self.assertTrue(os.path.exists(os.path.join(self.path, _SNAPSHOT_FILE)))
+        self.assertGreater(os.path.getsize(os.path.join(self.path, _LOG_FILE)), 0)
+
+        m = DurableHashMap(self.path)
+        self.assertEqual(m.get_size(), 49)
+        self.assertIsNone(m.get('k10'))
+        self.assertEqual(m.get('k11'), 'changed')
+        self.assertEqual(m.get('k49'), 49)
+
+    def test_corrupt_snapshot_is_an_error(self) -> None:
+        """A damaged snapshot raises ValueError instead of loading (and later checkpointing) a partial map."""
+        m = DurableHashMap(self.path, checkpoint_every=0)
+        for i in range(20):
+            m.put('k' + str(i), i)
+        m.checkpoint()
+        m.close()
+
+        snapshot_path = os.path.join(self.path, _SNAPSHOT_FILE)
+        with open(snapshot_path, 'rb') as f:
+            good = f.read()
+
+        damaged = bytearray(good)
+        damaged[len(good) // 2] ^= 0xFF
+        for data in (bytes(damaged), good[:-3], good + b'extra'):
+            with open(snapshot_path, 'wb') as f:
+                f.write(data)
+            with self.assertRaises(ValueError):
+                DurableHashMap(self.path)
+
+        with open(snapshot_path, 'wb') as f:
+            f.write(good)
+        self.assertEqual(DurableHashMap(self.path).get_size(), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+# Description: Tests for the HashMap tracing hooks. Maps are traced with ChromeTraceExporter, the trace is written to
+# a file and read back, and the recorded events are checked against what the map actually did.
+
+
+import json
+import os
+import tempfile
+import unittest
+
+import hash_map_cuckoo
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_2
+from hash_map_trace import ChromeTraceExporter
+
+
+def counting(map_class):
+    """Return a subclass of map_class that counts the resizes it actually performs."""
+
+    class CountingHashMap(map_class):
+
+        resizes = 0
+
+        def resize_table(self, new_capacity: int) -> None:
+            # with a tracer attached resize_table is entered twice per resize (once more through run_resize);
+            # the resize itself always runs with tracing switched off
+            if self._tracer is None and new_capacity >= max(1, self.get_size()):
+                CountingHashMap.resizes += 1
+            super().resize_table(new_capacity)
+
+    return CountingHashMap
+
+
+class TraceResizeTest(unittest.TestCase):
+
+    def _exported_events(self, tracer: ChromeTraceExporter) -> list:
+        """Write the tracer's events to a file and load them back."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trace.json')
+            tracer.write(path)
+            with open(path) as f:
+                return json.load(f)['traceEvents']
+
+    def test_every_resize_is_in_the_trace(self) -> None:
+        """Resizes are recorded whether or not the put that caused them was sampled."""
+        for module in (hash_map_sc, hash_map_oa, hash_map_cuckoo):
+            for sample_every in (1, 100, 100000):
+                with self.subTest(module=module.__name__, sample_every=sample_every):
+                    map_class = counting(module.HashMap)
+                    m = map_class(11, hash_function_2)
+                    tracer = ChromeTraceExporter(sample_every)
+                    m.set_tracer(tracer)
+                    for i in range(5000):
+                        m.put('key' + str(i), i)
+                    m.resize_table(m.get_capacity() * 2)
+
+                    events = self._exported_events(tracer)
+                    resizes = [e for e in events if e['name'] == 'resize_table']
+                    self.assertGreater(map_class.resizes, 5)
+                    self.assertEqual(len(resizes), map_class.resizes)
+                    # resizes caused by a put name its key; the direct call at the end has none
+                    self.assertTrue(all(e['args']['key'].startswith('key') for e in resizes[:-1]))
+                    self.assertEqual(resizes[-1]['args']['key'], '')
+                    self.assertTrue(all(e['args']['resize_us'] > 0 for e in resizes))
+
+    def test_sampling_rate(self) -> None:
+        """The countdown kept by the map samples about one call in every sample_every."""
+        for module in (hash_map_sc, hash_map_oa, hash_map_cuckoo):
+            with self.subTest(module=module.__name__):
+                m = module.HashMap(11, hash_function_2)
+                m.put('key', 1)
+                tracer = ChromeTraceExporter(100)
+                m.set_tracer(tracer)
+                for _ in range(10000):
+                    m.get('key')
+                gets = [e for e in self._exported_events(tracer) if e['name'] == 'get']
+                self.assertTrue(70 <= len(gets) <= 140, len(gets))
+
+                m.set_tracer(None)
+                m.get('key')
+                self.assertEqual(len(self._exported_events(tracer)), len(gets))
+
+    def test_rehash_puts_are_not_sampled(self) -> None:
+        """With every call traced, the only put events are the puts made from outside the map."""
+        for module in (hash_map_sc, hash_map_oa, hash_map_cuckoo):
+            with self.subTest(module=module.__name__):
+                m = module.HashMap(11, hash_function_2)
+                tracer = ChromeTraceExporter(1)
+                m.set_tracer(tracer)
+                for i in range(2000):
+                    m.put('key' + str(i), i)
+                puts = [e for e in self._exported_events(tracer) if e['name'] == 'put']
+                self.assertEqual(len(puts), 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()